@@ -0,0 +1,240 @@
+import os
+import re
+import glob
+import json
+import random
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import zstandard
+
+# Sections holding archive.org markup; these are compressed with the shared dictionary
+SECTION_FIELDS = ('section1', 'section2', 'section3', 'section4')
+
+FILE_MAGIC = b'IASECZ2\n'
+FILE_HEADER = struct.Struct('<IB')        # dictionary id, flags
+RECORD_HEADER = struct.Struct('<BIIIIII')  # record flags, identifier, origpath, section1-4 byte lengths
+
+FLAG_NORMALIZED_WHITESPACE = 0x01  # file flag
+FLAG_HAS_ORIGPATH = 0x01           # record flag
+
+NO_DICTIONARY = 0  # dictionary id for files written with plain zstd frames
+
+DICTIONARY_FILENAME = 'sections.zdict'
+DEFAULT_DICT_SIZE = 112 * 1024
+DEFAULT_LEVEL = 19
+DEFAULT_WORKERS = 20
+
+# Fewer samples than this makes zstd dictionary training fail or produce a useless dictionary
+MIN_TRAINING_SAMPLES = 1000
+
+# ASCII HTML whitespace only; \s would also match \xa0 (&nbsp;), which does not collapse
+INTERTAG_WHITESPACE = re.compile(r'>[ \t\r\n\f]+<')
+
+def normalize_whitespace(html_content):
+    """Collapse whitespace-only runs between tags to a single newline or space.
+
+    The result renders the same in a browser, but is not byte-identical to the
+    input (and alters <pre> blocks), so it is only applied when requested.
+    """
+    return INTERTAG_WHITESPACE.sub(
+        lambda m: '>\n<' if '\n' in m.group(0) else '> <', html_content
+    )
+
+def train_section_dictionary(records, dict_path, dict_size=DEFAULT_DICT_SIZE,
+                             sample_size=20000, normalize=False):
+    """Train a zstd dictionary on a random sample of section HTML and save it.
+
+    Returns None without writing anything when there are fewer than
+    MIN_TRAINING_SAMPLES non-empty sections to train on.
+    """
+    records = list(records)
+    if len(records) > sample_size:
+        records = random.sample(records, sample_size)
+
+    samples = []
+    for record in records:
+        for field in SECTION_FIELDS:
+            html_content = record.get(field) or ''
+            if normalize:
+                html_content = normalize_whitespace(html_content)
+            if html_content:
+                samples.append(html_content.encode('utf-8'))
+
+    if len(samples) < MIN_TRAINING_SAMPLES:
+        print(f"Only {len(samples):,} section samples, need {MIN_TRAINING_SAMPLES:,} to train a dictionary")
+        return None
+
+    print(f"Training section dictionary on {len(samples):,} samples from {len(records):,} records...")
+    dictionary = zstandard.train_dictionary(dict_size, samples)
+
+    os.makedirs(os.path.dirname(dict_path) or '.', exist_ok=True)
+    with open(dict_path, 'wb') as f:
+        f.write(dictionary.as_bytes())
+    print(f"Saved dictionary ({len(dictionary.as_bytes()):,} bytes): {dict_path}")
+
+    return dictionary
+
+def train_dictionary_or_none(records, dict_path, normalize=False):
+    """Train a section dictionary, reporting training errors instead of raising them"""
+    try:
+        return train_section_dictionary(records, dict_path, normalize=normalize)
+    except zstandard.ZstdError as e:
+        print(f"Dictionary training failed, writing plain zstd frames: {e}")
+        return None
+
+def load_dictionary(dict_path):
+    """Load a trained section dictionary from disk"""
+    with open(dict_path, 'rb') as f:
+        return zstandard.ZstdCompressionDict(f.read())
+
+def encode_record(record, compressor, normalize=False):
+    """Encode one record as a record header followed by its identifier, origpath and section frames"""
+    identifier = record['identifier'].encode('utf-8')
+    origpath = record.get('dc.identifier.origpath')
+    record_flags = FLAG_HAS_ORIGPATH if origpath is not None else 0
+    origpath = origpath.encode('utf-8') if origpath is not None else b''
+
+    sections = []
+    for field in SECTION_FIELDS:
+        html_content = record.get(field) or ''
+        if normalize:
+            html_content = normalize_whitespace(html_content)
+        # Empty sections are stored as zero-length blobs, not empty frames
+        sections.append(compressor.compress(html_content.encode('utf-8')) if html_content else b'')
+
+    header = RECORD_HEADER.pack(
+        record_flags, len(identifier), len(origpath), *(len(blob) for blob in sections)
+    )
+    return b''.join([header, identifier, origpath] + sections)
+
+def write_compact_file(records, path, dictionary, level=DEFAULT_LEVEL, normalize=False,
+                       max_workers=DEFAULT_WORKERS):
+    """Write records to a compact file with sections compressed by the shared dictionary.
+
+    Records are compressed in a thread pool (zstd releases the GIL) and written
+    in their original order. Pass dictionary=None to write plain zstd frames.
+    """
+    dict_id = dictionary.dict_id() if dictionary is not None else NO_DICTIONARY
+    flags = FLAG_NORMALIZED_WHITESPACE if normalize else 0
+
+    # ZstdCompressor instances are not thread-safe, so each worker gets its own
+    local = threading.local()
+
+    def encode(record):
+        if not hasattr(local, 'compressor'):
+            local.compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+        return encode_record(record, local.compressor, normalize)
+
+    count = 0
+    with open(path, 'wb') as f:
+        f.write(FILE_MAGIC)
+        f.write(FILE_HEADER.pack(dict_id, flags))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for encoded in executor.map(encode, records):
+                f.write(encoded)
+                count += 1
+
+    return count
+
+def read_compact_header(path):
+    """Return the dictionary id and whether sections were whitespace-normalized"""
+    with open(path, 'rb') as f:
+        return _read_file_header(f, path)
+
+def _read_file_header(f, path):
+    if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+        raise ValueError(f"Not a compact section file: {path}")
+
+    dict_id, flags = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    return {
+        'dict_id': dict_id,
+        'normalized': bool(flags & FLAG_NORMALIZED_WHITESPACE)
+    }
+
+def iter_compact_records(path, dictionary, fields=SECTION_FIELDS):
+    """Yield records from a compact file as dicts of the original strings.
+
+    Only the sections named in `fields` are decompressed; the others are skipped
+    without decoding, which keeps scans over identifiers/origpaths cheap. The
+    strings are the extracted originals unless read_compact_header(path)
+    reports 'normalized'. Files written without a dictionary ignore `dictionary`.
+    """
+    with open(path, 'rb') as f:
+        dict_id = _read_file_header(f, path)['dict_id']
+        if dict_id == NO_DICTIONARY:
+            decompressor = zstandard.ZstdDecompressor()
+        elif dictionary is None or dict_id != dictionary.dict_id():
+            raise ValueError(f"{path} was written with dictionary {dict_id}, "
+                             f"got dictionary {dictionary.dict_id() if dictionary is not None else None}")
+        else:
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if not header:
+                break
+            if len(header) != RECORD_HEADER.size:
+                raise ValueError(f"Truncated record header in {path}")
+
+            record_flags, identifier_len, origpath_len, *section_lens = RECORD_HEADER.unpack(header)
+
+            record = {"identifier": f.read(identifier_len).decode('utf-8')}
+            origpath = f.read(origpath_len).decode('utf-8')
+            record["dc.identifier.origpath"] = origpath if record_flags & FLAG_HAS_ORIGPATH else None
+
+            for field, length in zip(SECTION_FIELDS, section_lens):
+                if field not in fields:
+                    f.seek(length, os.SEEK_CUR)
+                    continue
+                blob = f.read(length)
+                record[field] = decompressor.decompress(blob).decode('utf-8') if blob else ''
+
+            yield record
+
+def read_compact_file(path, dict_path=None, fields=SECTION_FIELDS):
+    """Read every record from a compact file into a list"""
+    dictionary = load_dictionary(dict_path) if dict_path and os.path.exists(dict_path) else None
+    return list(iter_compact_records(path, dictionary, fields))
+
+def convert_json_batches(output_dir, dict_path=None, level=DEFAULT_LEVEL, normalize=False):
+    """Convert existing batch_*.json files in output_dir to the compact format"""
+    dict_path = dict_path or os.path.join(output_dir, DICTIONARY_FILENAME)
+    batch_files = sorted(glob.glob(os.path.join(output_dir, 'batch_*.json')))
+
+    if not batch_files:
+        print(f"No batch files found in {output_dir}")
+        return 0
+
+    dictionary = None
+    if os.path.exists(dict_path):
+        dictionary = load_dictionary(dict_path)
+        print(f"Using existing dictionary: {dict_path}")
+
+    total_records = 0
+    for batch_file in batch_files:
+        with open(batch_file, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+
+        # Train on the first batch with enough sections; earlier ones are written without a dictionary
+        if dictionary is None:
+            dictionary = train_dictionary_or_none(records, dict_path, normalize=normalize)
+
+        compact_file = os.path.splitext(batch_file)[0] + '.zsec'
+        count = write_compact_file(records, compact_file, dictionary, level, normalize)
+        total_records += count
+
+        json_size = os.path.getsize(batch_file)
+        compact_size = os.path.getsize(compact_file)
+        print(f"{os.path.basename(batch_file)} -> {os.path.basename(compact_file)}: "
+              f"{count:,} records, {json_size:,} -> {compact_size:,} bytes "
+              f"({json_size / max(compact_size, 1):.1f}x)")
+
+    return total_records
+
+if __name__ == "__main__":
+    OUTPUT_DIR = "extracted_data"
+
+    converted = convert_json_batches(OUTPUT_DIR)
+    print(f"Converted {converted:,} records")
@@ -253,10 +253,24 @@ def save_individual_files_parallel(data_list, output_dir, max_workers=10):
 
 # For very large datasets, process in batches with parallel processing
 def process_in_batches_parallel(identifiers_file, details_dir, download_dir, output_dir, 
-                               batch_size=50000, max_workers=20):
-    """Process very large datasets in batches with parallel processing"""
+                               batch_size=50000, max_workers=20, output_format='json'):
+    """Process very large datasets in batches with parallel processing
+
+    output_format is 'json' (batch_N.json) or 'compact' (batch_N.zsec, sections
+    compressed with a dictionary trained on the first batch with enough records;
+    see compact_storage).
+    """
     os.makedirs(output_dir, exist_ok=True)
     
+    # Shared section dictionary for compact output, reused across runs so resumed batches stay readable
+    dictionary = None
+    if output_format == 'compact':
+        # Imported here so JSON-only runs don't need zstandard installed
+        import compact_storage
+        dict_path = os.path.join(output_dir, compact_storage.DICTIONARY_FILENAME)
+        if os.path.exists(dict_path):
+            dictionary = compact_storage.load_dictionary(dict_path)
+    
     with open(identifiers_file, 'r', encoding='utf-8') as f:
         all_identifiers = [line.strip() for line in f if line.strip()]
     
@@ -287,9 +301,17 @@ def process_in_batches_parallel(identifiers_file, details_dir, download_dir, out
         )
         
         # Save batch
-        batch_file = os.path.join(output_dir, f"batch_{batch_num + 1}.json")
-        with open(batch_file, 'w', encoding='utf-8') as f:
-            json.dump(batch_data, f, indent=2, ensure_ascii=False)
+        if output_format == 'compact':
+            # Batches before the dictionary exists are written as plain zstd frames
+            if dictionary is None:
+                dictionary = compact_storage.train_dictionary_or_none(batch_data, dict_path)
+            batch_file = os.path.join(output_dir, f"batch_{batch_num + 1}.zsec")
+            compact_storage.write_compact_file(batch_data, batch_file, dictionary,
+                                               max_workers=max_workers)
+        else:
+            batch_file = os.path.join(output_dir, f"batch_{batch_num + 1}.json")
+            with open(batch_file, 'w', encoding='utf-8') as f:
+                json.dump(batch_data, f, indent=2, ensure_ascii=False)
         
         print(f"Saved batch {batch_num + 1} with {len(batch_data)} records")
         
@@ -312,6 +334,7 @@ if __name__ == "__main__":
     DOWNLOAD_DIR = "raw_html/download"
     OUTPUT_DIR = "extracted_data"
     MAX_WORKERS = 40
+    OUTPUT_FORMAT = "json"  # "compact" writes dictionary-compressed batch_N.zsec files
     
     start_time = time.time()
     
@@ -332,10 +355,13 @@ if __name__ == "__main__":
             print("Very large dataset detected. Using batched parallel processing...")
             processed, failed = process_in_batches_parallel(
                 IDENTIFIERS_FILE, DETAILS_DIR, DOWNLOAD_DIR, OUTPUT_DIR,
-                batch_size=50000, max_workers=MAX_WORKERS
+                batch_size=50000, max_workers=MAX_WORKERS, output_format=OUTPUT_FORMAT
             )
         else:
             # Use regular parallel processing
+            if OUTPUT_FORMAT != "json":
+                print(f"Warning: OUTPUT_FORMAT={OUTPUT_FORMAT!r} only applies to batched processing "
+                      f"(more than 200,000 identifiers). Writing JSON; convert batch files with compact_storage.py")
             processed = process_all_identifiers_parallel(
                 IDENTIFIERS_FILE, DETAILS_DIR, DOWNLOAD_DIR, OUTPUT_DIR, 
                 max_workers=MAX_WORKERS
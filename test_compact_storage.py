@@ -0,0 +1,79 @@
+import os
+import pytest
+
+zstandard = pytest.importorskip("zstandard")
+
+import compact_storage
+
+
+def make_records(count):
+    return [
+        {
+            "identifier": f"in.ernet.dli.2015.{i}",
+            "dc.identifier.origpath": f"/data/{i}" if i % 2 else None,
+            "section1": f'<div class="row metadata-list" role="list">\n  <dd>Book {i}</dd>\n</div>',
+            "section2": "",
+            "section3": f'<div class="metadata-expandable-list row" role="list"><dd>{i}</dd></div>',
+            "section4": f'<table class="directory-listing-table"><tr><td>{i}.pdf</td></tr></table>',
+        }
+        for i in range(count)
+    ]
+
+
+def test_round_trip_with_dictionary(tmp_path):
+    records = make_records(1000)
+    dict_path = str(tmp_path / compact_storage.DICTIONARY_FILENAME)
+    dictionary = compact_storage.train_section_dictionary(records, dict_path)
+    assert dictionary is not None
+
+    path = str(tmp_path / "batch_1.zsec")
+    assert compact_storage.write_compact_file(records, path, dictionary, max_workers=4) == 1000
+    assert compact_storage.read_compact_file(path, dict_path) == records
+    assert compact_storage.read_compact_header(path)["normalized"] is False
+
+
+def test_too_few_samples_writes_plain_frames(tmp_path):
+    dict_path = str(tmp_path / compact_storage.DICTIONARY_FILENAME)
+    records = make_records(3)
+    assert compact_storage.train_dictionary_or_none(records, dict_path) is None
+    assert not os.path.exists(dict_path)
+
+    path = str(tmp_path / "batch_1.zsec")
+    compact_storage.write_compact_file(records, path, None)
+    assert compact_storage.read_compact_file(path) == records
+
+
+def test_long_origpath(tmp_path):
+    records = make_records(1)
+    records[0]["dc.identifier.origpath"] = "/" + "x" * 65534
+    path = str(tmp_path / "batch_1.zsec")
+    compact_storage.write_compact_file(records, path, None)
+    assert compact_storage.read_compact_file(path) == records
+
+
+def test_normalize_whitespace_keeps_nbsp():
+    assert compact_storage.normalize_whitespace("<td>\xa0</td>") == "<td>\xa0</td>"
+    assert compact_storage.normalize_whitespace("<a>\n  <b> </b></a>") == "<a>\n<b> </b></a>"
+
+
+def test_empty_first_batch(tmp_path):
+    pytest.importorskip("bs4")
+    pytest.importorskip("pandas")
+    import extractdata
+
+    identifiers_file = tmp_path / "identifiers.txt"
+    identifiers_file.write_text("missing1\nmissing2\n", encoding="utf-8")
+    details_dir = tmp_path / "details"
+    download_dir = tmp_path / "download"
+    details_dir.mkdir()
+    download_dir.mkdir()
+    output_dir = tmp_path / "out"
+
+    processed, failed = extractdata.process_in_batches_parallel(
+        str(identifiers_file), str(details_dir), str(download_dir), str(output_dir),
+        batch_size=1, max_workers=2, output_format='compact'
+    )
+
+    assert failed == 2
+    for batch in ("batch_1.zsec", "batch_2.zsec"):
+        assert compact_storage.read_compact_file(str(output_dir / batch)) == []